@@ -1,51 +1,101 @@
-from utils.notifier import Notifier
-from utils.task_manager import TaskManager
-from monitors.ethereum_monitor import EthereumMonitor
-from monitors.solana_monitor import SolanaMonitor
-from monitors.dexscreener_monitor import DexScreenerMonitor
-
 import os
 import sys
-from dotenv import load_dotenv
+import time
+import resource
 import asyncio
+import logging
 
+started_at = time.perf_counter()
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "src")))
 
+from dotenv import load_dotenv
+from utils.config import (MONITORS, SOLANA_RPC_URLS, ETHEREUM_RPC_URLS, SOLANA_RPC_CREDITS, ETHEREUM_RPC_CREDITS,
+                          WALLET_SHARDS, WALLETS_FILE, PURCHASE_AGGREGATION_WINDOW, EVENT_QUEUE_SIZE, EVENT_LOG_FILE,
+                          ENRICHMENT_WORKERS, ENRICHMENT_TTL, ENRICHMENT_MAX_TRANSACTIONS, LOG_LEVEL,
+                          SUBSCRIPTIONS_FILE, CHAT_SEND_INTERVAL, GLOBAL_SEND_RATE, PROFILE_CYCLES, PROFILE_DIR,
+                          PROFILE_SLOWEST, PROFILE_SAMPLE_INTERVAL)
+from utils.event_bus import EventBus
+from utils.events import AlertEvent, PurchaseEvent
+from utils.log_utils import setup_logging
+from utils.notifier import Notifier
+from utils.profiler import CycleProfiler
+from utils.purchase_aggregator import PurchaseAggregator
+from utils.subscriptions import SubscriptionIndex
+from utils.rpc_pool import split_credits
+from utils.sharding import ShardManager, WALLET_SETTINGS
+from utils.task_manager import TaskManager
+from monitors.registry import create_monitors
+
 load_dotenv()
+setup_logging(LOG_LEVEL)
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL")
-ETHEREUM_RPC_URL = os.getenv("ETHEREUM_RPC_URL")
 
 TARGET_ETH_WALLETS = ["5ntZqUP1qF36hZc9sccq9ogKWmGyA9cp1YyPedZXsPdB", "5BiPQBP7P5F1JAarb4FDfUPBEXesfNVKYFKgTw3re9FB", "77D6ZCgfgpfNTT9hs8wapJiwU12eqgECBXFgarcbZpRY"]
 TARGET_SOL_WALLETS = ["YourSolWallet1", "YourSolWallet2"]
 THRESHOLD_AMOUNT = 1
 DEX_CHECK_INTERVAL = 600
 
-notifier = Notifier(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID)
-task_manager = TaskManager()
-
-# eth_monitor = EthereumMonitor(
-#     rpc_url=ETHEREUM_RPC_URL,
-#     wallets=TARGET_ETH_WALLETS,
-#     threshold=THRESHOLD_AMOUNT,
-#     notifier=notifier
-# )
-# task_manager.add_task(eth_monitor.fetch_transactions())
-#
-# sol_monitor = SolanaMonitor(
-#     rpc_url=SOLANA_RPC_URL,
-#     wallets=TARGET_SOL_WALLETS,
-#     threshold=THRESHOLD_AMOUNT,
-#     notifier=notifier
-# )
-# task_manager.add_task(sol_monitor.fetch_transactions())
-
-dex_monitor = DexScreenerMonitor(notifier)
-task_manager.add_task(dex_monitor.run())
+settings = {
+    "solana_rpc_urls": SOLANA_RPC_URLS,
+    "ethereum_rpc_urls": ETHEREUM_RPC_URLS,
+    "solana_rpc_credits": SOLANA_RPC_CREDITS,
+    "ethereum_rpc_credits": ETHEREUM_RPC_CREDITS,
+    "sol_wallets": TARGET_SOL_WALLETS,
+    "eth_wallets": TARGET_ETH_WALLETS,
+    "threshold": THRESHOLD_AMOUNT,
+}
+
+
+def log_startup(monitors):
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    # ru_maxrss is reported in kilobytes on Linux
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    logging.info(f"Started monitors {', '.join(monitors) or 'none'} in {elapsed_ms:.0f} ms, max RSS {max_rss_mb:.1f} MB")
+
 
 # Run all tasks
 if __name__ == "__main__":
     print("Starting Multi-Chain Monitor...")
+    # Off unless PROFILE_CYCLES is set, SIGUSR1 toggles it at runtime
+    profiler = CycleProfiler(PROFILE_CYCLES, PROFILE_DIR, PROFILE_SLOWEST, PROFILE_SAMPLE_INTERVAL)
+    task_manager = TaskManager(profiler)
+    bus = EventBus(EVENT_QUEUE_SIZE, EVENT_LOG_FILE)
+    subscriptions = SubscriptionIndex.load(SUBSCRIPTIONS_FILE, TELEGRAM_CHAT_ID)
+    notifier = Notifier(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, subscriptions, bus, CHAT_SEND_INTERVAL, GLOBAL_SEND_RATE)
+    aggregator = PurchaseAggregator(bus, PURCHASE_AGGREGATION_WINDOW)
+    bus.subscribe(PurchaseEvent, aggregator.add, auto_ack=False)
+    bus.subscribe(AlertEvent, notifier.deliver, auto_ack=False)
+    task_manager.add_task(bus.run())
+
+    enrich = ENRICHMENT_WORKERS > 0 and SOLANA_RPC_URLS
+    sharded = [name for name in MONITORS if name in WALLET_SETTINGS] if WALLET_SHARDS > 0 else []
+    names = [name for name in MONITORS if name not in sharded]
+
+    # Pools within a process share each endpoint's budget, across processes it is split between them
+    for chain in WALLET_SETTINGS:
+        in_process = chain in names or (chain == "solana" and enrich)
+        processes = (WALLET_SHARDS if chain in sharded else 0) + (1 if in_process else 0)
+        if processes > 1:
+            settings[f"{chain}_rpc_credits"] = split_credits(settings[f"{chain}_rpc_credits"], processes)
+
+    if enrich:
+        # solana is only loaded once the first Solana alert is analysed
+        from utils.chain_analytics import ChainAnalytics
+        from utils.enrichment import TokenEnricher
+        analytics = ChainAnalytics(settings["solana_rpc_credits"], ENRICHMENT_MAX_TRANSACTIONS)
+        enricher = TokenEnricher(notifier, analytics, ENRICHMENT_WORKERS, ENRICHMENT_TTL)
+        notifier.listeners.append(enricher.on_delivered)
+        task_manager.add_task(enricher.run())
+
+    if sharded:
+        shard_manager = ShardManager(sharded, settings, WALLET_SHARDS, bus.publish, WALLETS_FILE)
+        task_manager.add_task(shard_manager.run())
+
+    monitors = create_monitors(names, settings, bus.publish)
+    for name, monitor in monitors.items():
+        task_manager.add_cycle(name, monitor.run_cycle, monitor.interval)
+
+    log_startup(monitors)
     asyncio.run(task_manager.run_all())
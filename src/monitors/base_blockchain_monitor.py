@@ -2,13 +2,20 @@ from abc import ABC, abstractmethod
 
 
 class BaseBlockchainMonitor(ABC):
-    def __init__(self, wallets, threshold):
+    def __init__(self, wallets, threshold, publish, interval=10):
         self.wallets = wallets
         self.threshold = threshold
+        # Coroutine receiving a PurchaseEvent, either the in-process aggregator or a shard channel
+        self.publish = publish
+        self.interval = interval
 
     @abstractmethod
-    async def fetch_transactions(self):
+    async def run_cycle(self):
+        """Poll once for new transactions of the monitored wallets."""
         pass
 
     async def process_transactions(self, transaction):
         pass
+
+    def set_wallets(self, wallets):
+        self.wallets = wallets
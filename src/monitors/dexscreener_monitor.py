@@ -1,63 +1,29 @@
-import asyncio
 import aiohttp
 import os
 import logging
 from dotenv import load_dotenv
-from utils.notifier import Notifier
-from utils.config import MAX_VALUES, WEIGHTS
-from utils.token_filter import TokenFilter
+from utils.events import AlertEvent
+from utils.config import RULES_FILE, SHADOW_RULES_FILE
+from utils.rule_engine import RuleEngine
+from utils.snapshot_diff import SnapshotDiff
+from utils.log_utils import RateLimitedSampler, RejectionCounter
+from utils.config import TOKEN_LOG_RATE
+from utils.profiler import stage
 
-logging.basicConfig(format="%(asctime)s - %(message)s", level=logging.INFO)
 load_dotenv()
 
 LATEST_TOKENS_ENDPOINT = os.getenv("DEX_LATEST_TOKENS_ENDPOINT")
 BOOSTED_TOKENS_ENDPOINT = os.getenv("DEX_BOOSTED_TOKENS_ENDPOINT")
 POOL_TOKENS_ENDPOINT = os.getenv("DEX_TOKEN_POOL_ENDPOINT")
-BOOSTED_TOKENS_THRESHOLD_SCORE = float(os.getenv("DEX_BOOSTED_TOKEN_THRESHOLD_SCORE", 0))
 
-token_filter = TokenFilter()
-
-
-def normalize(value, max_value):
-    return min(value / max_value, 1) * 100
+rule_engine = RuleEngine(RULES_FILE, SHADOW_RULES_FILE)
+rejections = RejectionCounter("DexScreener")
+# Detailed per token lines are debug level and limited to TOKEN_LOG_RATE per minute
+token_log_sampler = RateLimitedSampler(TOKEN_LOG_RATE)
 
 
 def calculate_potential_score(token_data):
-    try:
-        volume = token_data.get("volume", {}).get("h24", 0)
-        price_change_m5 = token_data.get("priceChange", {}).get("m5", 0)
-        price_change_h1 = token_data.get("priceChange", {}).get("h1", 0)
-        txns_buys_m5 = token_data.get("txns", {}).get("m5", {}).get("buys", 0)
-        txns_buys_h1 = token_data.get("txns", {}).get("h1", {}).get("buys", 0)
-        txns_sells_m5 = token_data.get("txns", {}).get("m5", {}).get("sells", 0)
-        txns_m5 = txns_buys_m5 + txns_sells_m5
-
-        # fdv = token_data.get("fdv", 0) or 0
-        # liquidity = token_data.get("liquidity", {}).get("usd", 0)
-        # sells = token_data.get("txns", {}).get("h24", {}).get("sells", 0)
-
-        base_token = token_data.get("baseToken", {})
-        token_address = base_token.get("address", "N/A")
-        logging.info(
-            f"token_address: {token_address}, volume: {volume}, price_change_m5: {price_change_m5}, price_change_h1: {price_change_h1}, buys_h24: {txns_buys_m5}, sells_h24: {txns_buys_h1}, txns_sells_m5: {txns_sells_m5}, txns_m5: {txns_m5}")
-
-        # FOMO emotions within 5 minutes
-        buys_ratio = txns_buys_m5 / max(txns_sells_m5, 1)
-        volume_score = normalize(volume, MAX_VALUES["volume_h24"]) * WEIGHTS["volume_h24"]
-        price_m5_score = normalize(price_change_m5, MAX_VALUES["price_change_m5"]) * WEIGHTS["price_change_m5"]
-        price_h1_score = normalize(price_change_h1, MAX_VALUES["price_change_h1"]) * WEIGHTS["price_change_h1"]
-        txns_buys_m5_score = normalize(txns_buys_m5, MAX_VALUES["txns_buys_m5"]) * WEIGHTS["txns_buys_m5"]
-        txns_buys_h1_score = normalize(txns_buys_h1, MAX_VALUES["txns_buys_h1"]) * WEIGHTS["txns_buys_h1"]
-        txns_sells_m5_score = normalize(txns_sells_m5, MAX_VALUES["txns_sells_m5"]) * WEIGHTS["txns_sells_m5"]
-        txns_score = normalize(txns_m5, MAX_VALUES["txns_m5"]) * WEIGHTS["txns_m5"]
-
-        # extra bonus
-        buys_boost = 5 if buys_ratio > 2 else 0
-        total_score = volume_score + price_m5_score + price_h1_score + txns_buys_m5_score + txns_buys_h1_score + txns_sells_m5_score + txns_score + buys_boost
-        return round(total_score, 2)
-    except Exception as e:
-        logging.error(f"calculate_potential_score error: {e}")
-        return 0.00
+    return rule_engine.live.score(token_data)
 
 
 async def fetch_json(url):
@@ -67,16 +33,16 @@ async def fetch_json(url):
                 if response.status == 200:
                     return await response.json()
                 else:
-                    logging.info(f"Error fetching {url}: {response.status}")
+                    logging.info("Error fetching %s: %s", url, response.status)
                     return None
     except Exception as e:
-        logging.error(f"fetch_json error: {e}")
+        logging.error("fetch_json error: %s", e)
         return None
 
 
 async def get_latest_tokens():
     data = await fetch_json(LATEST_TOKENS_ENDPOINT)
-    if data is None:
+    if not isinstance(data, list):
         logging.info("Error fetching latest token profiles")
         return []
 
@@ -111,66 +77,63 @@ async def fetch_pool_tokens(chain_id, token_address):
         best_pool_data = max(pool_data, key=lambda x: x.get("liquidity", {}).get("usd", 0), default=None)
         return best_pool_data
     except Exception as e:
-        logging.error(f"Error fetching pool tokens: {e}")
+        logging.error("Error fetching pool tokens: %s", e)
         return None
 
 
 class DexScreenerMonitor:
-    def __init__(self, notifier: Notifier, interval=60):
-        self.notifier = notifier
+    def __init__(self, publish, interval=60):
+        self.publish = publish
         self.interval = interval
-        self.last_token_ids = set()
-        self.last_boosted_ids = set()
+        self.latest_tokens = SnapshotDiff()
 
     async def process_latest_tokens(self):
-        """Monitor newly listed tokens."""
-        tokens = await get_latest_tokens()
+        """Feed newly listed tokens into the pool detail, filter and score pipeline."""
+        with stage("fetch"):
+            tokens = await get_latest_tokens()
         if not tokens:
-            print("No new tokens")
             return
 
-        new_tokens = [token for token in tokens if token["tokenAddress"] not in self.last_token_ids]
-        if not new_tokens:
-            return
+        with stage("diff"):
+            new_tokens = self.latest_tokens.diff(tokens)
+        if new_tokens:
+            logging.info("%d new token profiles", len(new_tokens))
 
         for token in new_tokens:
-            message = (
-                f"🚀 **New Token Listed**\n\n"
-                f"**Chain:** {token['chainId'].capitalize()}\n"
-                f"**Token Address:** `{token['tokenAddress']}`\n"
-                f"🔗 [View on DexScreener]({token['url']})\n"
-                f"📝 Description: {token.get('description', 'No description available')}\n"
-            )
-            await self.notifier.send_message(message)
-
-        self.last_token_ids.update(token["tokenAddress"] for token in new_tokens)
+            await self.process_token(token)
 
     async def process_boosted_tokens(self):
-        try:
+        with stage("fetch"):
             tokens = await get_boosted_tokens()
-            if not tokens:
-                return
+        for token in tokens:
+            await self.process_token(token)
 
-            for token in tokens:
-                chain_id = token.get("chainId")
-                token_address = token.get("tokenAddress")
-                if not chain_id or not token_address:
-                    continue
+    async def process_token(self, token):
+        try:
+            chain_id = token.get("chainId")
+            token_address = token.get("tokenAddress")
+            if not chain_id or not token_address:
+                return
 
+            with stage("fetch"):
                 pool_token_detail = await fetch_pool_tokens(chain_id, token_address)
-                if not pool_token_detail:
-                    continue
+            if not pool_token_detail:
+                return
 
-                if not token_filter.filter_token(pool_token_detail):
-                    logging.info(f"Token {token_address} does not meet the filter criteria")
-                    continue
+            reason, potential_score, alert = rule_engine.evaluate(pool_token_detail)
+            if reason is not None:
+                rejections.add(reason)
+                if token_log_sampler.allow():
+                    logging.debug("Token %s does not meet the filter criteria: %s", token_address, reason)
+                return
 
-                potential_score = calculate_potential_score(pool_token_detail)
-                logging.info(f"token_address: {token_address}, Potential score: {potential_score}")
-                if potential_score >= BOOSTED_TOKENS_THRESHOLD_SCORE:
-                    await self.send_potential_token_alert(pool_token_detail, potential_score)
+            if token_log_sampler.allow():
+                logging.debug("token_address: %s, Potential score: %s", token_address, potential_score)
+            if alert:
+                logging.info("Potential token %s scored %s", token_address, potential_score)
+                await self.send_potential_token_alert(pool_token_detail, potential_score)
         except Exception as e:
-            logging.error(f"Error processing boosted tokens: {e}")
+            logging.error("Error processing token %s: %s", token.get("tokenAddress"), e)
 
     async def send_potential_token_alert(self, token_data, potential_score):
         base_token = token_data.get("baseToken", {})
@@ -199,15 +162,13 @@ class DexScreenerMonitor:
             f"🔍 [View on DexScreener]({url})"
         )
 
-        await self.notifier.send_message(message)
-
-    async def run(self):
-        """Main monitoring loop."""
-        while True:
-            try:
-                # await self.process_latest_tokens()
-                await self.process_boosted_tokens()
-            except Exception as e:
-                logging.error(f"DexScreenerMonitor error: {e}")
+        with stage("notify"):
+            await self.publish(AlertEvent(chain_id, address, potential_score, (), message))
 
-            await asyncio.sleep(self.interval)
+    async def run_cycle(self):
+        """One monitoring pass, scheduled every `interval` seconds by TaskManager.add_cycle."""
+        rule_engine.reload_if_changed()
+        await self.process_latest_tokens()
+        await self.process_boosted_tokens()
+        rule_engine.log_stats()
+        rejections.log_summary()
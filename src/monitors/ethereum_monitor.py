@@ -1,35 +1,38 @@
-import asyncio
-
 from web3 import Web3
 from monitors.base_blockchain_monitor import BaseBlockchainMonitor
+from utils.config import RPC_HEDGE_PERCENTILE
+from utils.events import PurchaseEvent
+from utils.profiler import stage
+from utils.rpc_pool import RpcPool
 
 
 class EthereumMonitor(BaseBlockchainMonitor):
-    def __init__(self, rpc_url, wallets, threshold, notifier):
-        super().__init__(wallets, threshold)
-        self.web3 = Web3(Web3.HTTPProvider(rpc_url))
-        self.notifier = notifier
-        self.latest_block = self.web3.eth.block_number
+    def __init__(self, rpc_urls, wallets, threshold, publish, rpc_credits=None):
+        super().__init__(wallets, threshold, publish)
+        self.rpc = RpcPool.from_urls("ethereum", rpc_urls, lambda url: Web3(Web3.HTTPProvider(url)),
+                                     credits=rpc_credits, hedge_percentile=RPC_HEDGE_PERCENTILE)
+        self.latest_block = None
+
+    async def run_cycle(self):
+        with stage("fetch"):
+            current_block = await self.rpc.call(lambda web3: web3.eth.block_number)
+        if self.latest_block is None:
+            self.latest_block = current_block
+            return
 
-    async def fetch_transactions(self):
-        while True:
-            current_block = self.web3.eth.block_number
-            for block_number in range(self.latest_block + 1, current_block + 1):
-                block = self.web3.eth.get_block(block_number, full_transactions=True)
-                for tx in block.transactions:
-                    if tx.to and tx.to.lower() in [w.lower() for w in self.wallets]:
-                        await self.process_transaction(tx)
-                self.latest_block = block_number
-            await asyncio.sleep(10)
+        for block_number in range(self.latest_block + 1, current_block + 1):
+            with stage("fetch"):
+                block = await self.rpc.call(lambda web3: web3.eth.get_block(block_number, full_transactions=True))
+            with stage("decode"):
+                wallets = {w.lower() for w in self.wallets}
+                matched = [tx for tx in block.transactions if tx.to and tx.to.lower() in wallets]
+            for tx in matched:
+                await self.process_transaction(tx)
+            self.latest_block = block_number
 
     async def process_transaction(self, tx):
-        value_in_ether = self.web3.fromWei(tx.value, 'ether')
+        value_in_ether = Web3.from_wei(tx.value, 'ether')
         if value_in_ether >= self.threshold:
-            message = f"""
-            🔥 **[Ethereum Transaction Alert]**
-            **From:** `{tx['from']}`
-            **To:** `{tx.to}`
-            **Value:** `{value_in_ether:.4f}` ETH
-            **Tx Hash:** `{tx.hash.hex()}`
-            """
-            await self.notifier.send_notification(message)
+            with stage("notify"):
+                await self.publish(PurchaseEvent("ethereum", tx.to, "ETH", "", float(value_in_ether),
+                                                 float(value_in_ether), tx.hash.hex()))
@@ -0,0 +1,54 @@
+import logging
+
+# Monitor factories by name. Each factory imports its monitor module when called, so the
+# web3/solana dependencies of a disabled monitor are never loaded.
+MONITOR_FACTORIES = {}
+
+
+def register(name):
+    def decorator(factory):
+        MONITOR_FACTORIES[name] = factory
+        return factory
+
+    return decorator
+
+
+@register("dexscreener")
+def create_dexscreener_monitor(settings, publish):
+    from monitors.dexscreener_monitor import DexScreenerMonitor
+    return DexScreenerMonitor(publish)
+
+
+@register("solana")
+def create_solana_monitor(settings, publish):
+    from monitors.solana_monitor import SolanaMonitor
+    return SolanaMonitor(
+        rpc_urls=settings["solana_rpc_urls"],
+        wallets=settings["sol_wallets"],
+        threshold=settings["threshold"],
+        publish=publish,
+        rpc_credits=settings.get("solana_rpc_credits")
+    )
+
+
+@register("ethereum")
+def create_ethereum_monitor(settings, publish):
+    from monitors.ethereum_monitor import EthereumMonitor
+    return EthereumMonitor(
+        rpc_urls=settings["ethereum_rpc_urls"],
+        wallets=settings["eth_wallets"],
+        threshold=settings["threshold"],
+        publish=publish,
+        rpc_credits=settings.get("ethereum_rpc_credits")
+    )
+
+
+def create_monitors(names, settings, publish):
+    monitors = {}
+    for name in names:
+        factory = MONITOR_FACTORIES.get(name)
+        if factory is None:
+            logging.error(f"Unknown monitor: {name}")
+            continue
+        monitors[name] = factory(settings, publish)
+    return monitors
@@ -1,43 +1,97 @@
-import asyncio
-
 from solana.rpc.api import Client
 from solders.pubkey import Pubkey
 from monitors.base_blockchain_monitor import BaseBlockchainMonitor
+from utils.config import RPC_HEDGE_PERCENTILE
+from utils.events import PurchaseEvent
+from utils.profiler import stage
+from utils.rpc_pool import RpcPool
+
+
+LAMPORTS_PER_SOL = 1_000_000_000
+WRAPPED_SOL_MINT = "So11111111111111111111111111111111111111112"
+
+
+def token_balances(balances, wallet):
+    totals = {}
+    for balance in balances or []:
+        mint = str(balance.mint)
+        if str(balance.owner) == wallet and mint != WRAPPED_SOL_MINT:
+            totals[mint] = totals.get(mint, 0.0) + float(balance.ui_token_amount.ui_amount_string)
+    return totals
+
+
+def decode_purchase(wallet, transaction):
+    """Return (mint, SOL spent, tokens received) when the transaction bought a token with SOL, else None.
+
+    Read from the wallet's balance changes, so it works for any DEX or aggregator. The SOL spent excludes the
+    transaction fee but includes rent of token accounts opened by the swap.
+    """
+    meta = transaction.transaction.meta
+    if meta is None or meta.err is not None:
+        return None
+
+    account_keys = [str(key) for key in transaction.transaction.transaction.message.account_keys]
+    if wallet not in account_keys:
+        return None
+    index = account_keys.index(wallet)
+    lamports_spent = meta.pre_balances[index] - meta.post_balances[index]
+    if index == 0:
+        lamports_spent -= meta.fee
+
+    before = token_balances(meta.pre_token_balances, wallet)
+    after = token_balances(meta.post_token_balances, wallet)
+    received = {mint: amount - before.get(mint, 0.0) for mint, amount in after.items()}
+    mint, quantity = max(received.items(), key=lambda item: item[1], default=(None, 0.0))
+    if lamports_spent <= 0 or quantity <= 0:
+        return None
+    return mint, lamports_spent / LAMPORTS_PER_SOL, quantity
 
 
 class SolanaMonitor(BaseBlockchainMonitor):
-    def __init__(self, rpc_url, wallets, threshold, notifier):
-        super().__init__(wallets, threshold)
-        self.client = Client(rpc_url)
-        self.notifier = notifier
+    def __init__(self, rpc_urls, wallets, threshold, publish, rpc_credits=None):
+        super().__init__(wallets, threshold, publish)
+        self.rpc = RpcPool.from_urls("solana", rpc_urls, Client, credits=rpc_credits,
+                                     hedge_percentile=RPC_HEDGE_PERCENTILE)
         self.latest_signatures = {wallet: None for wallet in wallets}
 
-    async def fetch_transactions(self):
-        while True:
-            for wallet in self.wallets:
-                pubkey = Pubkey.from_string(wallet)
-                response = self.client.get_signatures_for_address(pubkey, before=self.latest_signatures[wallet])
-                for tx in response.value:
-                    self.latest_signatures[wallet] = tx.signature
-                    await self.process_transaction(tx)
-            await asyncio.sleep(10)
-
-    async def process_transaction(self, tx):
-        tx_details = self.client.get_transaction(tx.signature, max_supported_transaction_version=0)
-        if not tx - tx_details or not tx_details.value:
+    def set_wallets(self, wallets):
+        super().set_wallets(wallets)
+        self.latest_signatures = {wallet: self.latest_signatures.get(wallet) for wallet in wallets}
+
+    async def run_cycle(self):
+        for wallet in list(self.wallets):
+            pubkey = Pubkey.from_string(wallet)
+            until = self.latest_signatures.get(wallet)
+            with stage("fetch"):
+                response = await self.rpc.call(lambda client: client.get_signatures_for_address(pubkey, until=until))
+            if not response.value:
+                continue
+
+            # Signatures come newest first, everything up to the newest one seen is skipped next cycle
+            self.latest_signatures[wallet] = response.value[0].signature
+            if until is None:
+                # The first poll of a wallet only marks where its history ends
+                continue
+            for tx in reversed(response.value):
+                await self.process_transaction(wallet, tx)
+
+    async def process_transaction(self, wallet, tx):
+        with stage("fetch"):
+            tx_details = await self.rpc.call(
+                lambda client: client.get_transaction(tx.signature, max_supported_transaction_version=0))
+        if not tx_details or not tx_details.value:
+            return
+
+        with stage("decode"):
+            purchase = decode_purchase(wallet, tx_details.value)
+        if purchase is None:
             return
 
-        # TODO
-        parsed_tx = tx_details.value
-        token_name = ""
-        token_contract = ""
-        sol_spent = 1.0
-        quantity = 1.0
-        message = f"""
-            🔥 **[Solana Transaction Alert]**
-            **Token:** `{token_name}`
-            **Contract:** `{token_contract}`
-            **Spent:** `{sol_spent:.4f}` SOL
-            **Quantity:** `{quantity:.2f}`
-            """
-        await self.notifier.send_message(message)
\ No newline at end of file
+        mint, sol_spent, quantity = purchase
+        if sol_spent < self.threshold:
+            return
+        # Token metadata is not part of the transaction, the alert names the token by its shortened mint
+        token_name = f"{mint[:4]}…{mint[-4:]}"
+        with stage("notify"):
+            await self.publish(PurchaseEvent("solana", wallet, token_name, mint, sol_spent, quantity,
+                                             str(tx.signature)))
@@ -1,38 +1,52 @@
 import asyncio
-import os
-
-import aiohttp
 import logging
 from datetime import datetime, timedelta
-from solana.rpc.async_api import AsyncClient
-from solders.signature import Signature
-from base58 import b58encode, b58decode
-from dotenv import load_dotenv
+from utils.config import SOLANA_RPC_URLS, SOLANA_RPC_CREDITS, RPC_HEDGE_PERCENTILE
+from utils.rpc_pool import RpcPool
 
-load_dotenv()
-SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL")
+# solana/solders are imported on first use, so enabling enrichment does not load them at startup
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+# SPL token accounts are 165 bytes with the mint in the first 32
+TOKEN_ACCOUNT_SIZE = 165
+# Largest token accounts whose transactions are checked for liquidity events
+LIQUIDITY_POOLS = 5
 
 
 class ChainAnalytics:
-    def __init__(self):
-        self.solana_client = AsyncClient(SOLANA_RPC_URL)
-
-    def get_solana_token_accounts(self, token_address):
+    def __init__(self, credits=SOLANA_RPC_CREDITS, max_transactions=50):
+        self.credits = credits
+        # Bounds the get_transaction calls of each analysis, they are fetched one by one
+        self.max_transactions = max_transactions
+        self._rpc = None
+
+    @property
+    def rpc(self):
+        # Connect on first use rather than at construction
+        if self._rpc is None:
+            from solana.rpc.async_api import AsyncClient
+            self._rpc = RpcPool.from_urls("solana", SOLANA_RPC_URLS, AsyncClient, credits=self.credits,
+                                          blocking=False, hedge_percentile=RPC_HEDGE_PERCENTILE)
+        return self._rpc
+
+    async def get_solana_token_accounts(self, token_address):
+        from solana.rpc.types import MemcmpOpts
+        from solders.pubkey import Pubkey
         try:
-            response = self.solana_client.get_token_accounts_by_mint(token_address)
-            if response.value:
-                return response.value
-            return []
+            response = await self.rpc.call(lambda client: client.get_program_accounts_json_parsed(
+                Pubkey.from_string(TOKEN_PROGRAM_ID),
+                filters=[TOKEN_ACCOUNT_SIZE, MemcmpOpts(offset=0, bytes=str(token_address))]
+            ))
+            return response.value or []
         except Exception as e:
             logging.error(f"Error getting Solana token accounts: {e}")
-            return []
+            return None
 
-    def get_solana_daily_active_addresses(self, token_address, days=1):
+    async def get_solana_daily_active_addresses(self, token_address, days=1):
         try:
-            recent_blocks = self.solana_client.get_signatures_for_address(
+            recent_blocks = await self.rpc.call(lambda client: client.get_signatures_for_address(
                 token_address,
-                limit=1000
-            )
+                limit=self.max_transactions
+            ))
 
             if not recent_blocks.value:
                 return 0
@@ -43,27 +57,29 @@ class ChainAnalytics:
             unique_addresses = set()
 
             for sig in recent_blocks.value:
-                tx_time = datetime.fromtimestamp(sig.block_time)
-                if tx_time < start_time:
+                if sig.block_time is None or datetime.fromtimestamp(sig.block_time) < start_time:
                     continue
 
-                tx = self.solana_client.get_transaction(
-                    Signature.from_string(sig.signature)
-                )
+                tx = await self.rpc.call(lambda client: client.get_transaction(
+                    sig.signature,
+                    max_supported_transaction_version=0
+                ))
 
                 if tx.value:
-                    for account in tx.value.transaction.message.account_keys:
+                    for account in tx.value.transaction.transaction.message.account_keys:
                         unique_addresses.add(str(account))
 
             return len(unique_addresses)
 
         except Exception as e:
             logging.error(f"Error getting Solana daily active addresses: {e}")
-            return 0
+            return None
 
-    def get_solana_token_holders_distribution(self, token_address):
+    async def get_solana_token_holders_distribution(self, token_address):
         try:
-            accounts = self.get_solana_token_accounts(token_address)
+            accounts = await self.get_solana_token_accounts(token_address)
+            if accounts is None:
+                return None
             if not accounts:
                 return {}
 
@@ -95,57 +111,69 @@ class ChainAnalytics:
 
         except Exception as e:
             logging.error(f"Error getting Solana token holders distribution: {e}")
-            return {}
+            return None
 
-    def get_solana_token_liquidity_history(self, token_address, days=7):
+    async def get_solana_token_liquidity_history(self, token_address, days=7):
         try:
-            pool_info = self.solana_client.get_token_largest_accounts(token_address)
+            pool_info = await self.rpc.call(lambda client: client.get_token_largest_accounts(token_address))
             if not pool_info.value:
                 return []
 
             liquidity_history = []
             current_time = datetime.now()
 
-            for pool in pool_info.value[:5]:
+            pools = pool_info.value[:LIQUIDITY_POOLS]
+            for pool in pools:
                 pool_address = pool.address
 
-                signatures = self.solana_client.get_signatures_for_address(
+                signatures = await self.rpc.call(lambda client: client.get_signatures_for_address(
                     pool_address,
-                    limit=100
-                )
+                    limit=max(1, self.max_transactions // len(pools))
+                ))
 
                 if signatures.value:
                     for sig in signatures.value:
-                        tx_time = datetime.fromtimestamp(sig.block_time)
-                        if (current_time - tx_time).days > days:
+                        if sig.block_time is None or (current_time - datetime.fromtimestamp(sig.block_time)).days > days:
                             continue
 
-                        tx = self.solana_client.get_transaction(
-                            Signature.from_string(sig.signature)
-                        )
+                        tx = await self.rpc.call(lambda client: client.get_transaction(
+                            sig.signature,
+                            max_supported_transaction_version=0
+                        ))
 
                         if tx.value:
+                            meta = tx.value.transaction.meta
                             liquidity_history.append({
                                 'timestamp': sig.block_time,
                                 'pool_address': str(pool_address),
-                                'transaction': sig.signature,
-                                'change': tx.value.meta.pre_token_balances if tx.value.meta else None
+                                'transaction': str(sig.signature),
+                                'change': meta.pre_token_balances if meta else None
                             })
 
             return sorted(liquidity_history, key=lambda x: x['timestamp'])
 
         except Exception as e:
             logging.error(f"Error getting Solana liquidity history: {e}")
-            return []
+            return None
 
-    def get_token_analytics(self, token_address):
+    async def get_token_analytics(self, token_address):
+        from solders.pubkey import Pubkey
         try:
+            mint = Pubkey.from_string(token_address)
+            daily_active_addresses, holders_distribution, liquidity_history = await asyncio.gather(
+                self.get_solana_daily_active_addresses(mint),
+                self.get_solana_token_holders_distribution(mint),
+                self.get_solana_token_liquidity_history(mint)
+            )
+            # Each analysis returns None when it failed, a partial result is not worth caching or posting
+            if None in (daily_active_addresses, holders_distribution, liquidity_history):
+                return None
             return {
-                'daily_active_addresses': self.get_solana_daily_active_addresses(token_address),
-                'holders_distribution': self.get_solana_token_holders_distribution(token_address),
-                'liquidity_history': self.get_solana_token_liquidity_history(token_address)
+                'daily_active_addresses': daily_active_addresses,
+                'holders_distribution': holders_distribution,
+                'liquidity_history': liquidity_history
             }
 
         except Exception as e:
             logging.error(f"Error getting token analytics: {e}")
-            return {}
+            return None
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+
+
+class RateLimiter:
+    """Token bucket shared by every chat, keeps the bot under Telegram's global send rate."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class PermanentError(Exception):
+    """A request that can never succeed and is not retried, `chat_gone` when the chat itself is unreachable."""
+
+    def __init__(self, error, chat_gone=False):
+        super().__init__(str(error))
+        self.chat_gone = chat_gone
+
+
+def retry_delay(error, attempt):
+    """Seconds to wait before retrying a failed request, Telegram's RetryAfter says how long itself."""
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        return getattr(retry_after, "total_seconds", lambda: retry_after)()
+    return 2 ** attempt
+
+
+class ChatQueues:
+    """One bounded request queue and worker per chat, so a slow or busy chat never delays the others.
+
+    Requests are coroutine functions making one Telegram call. A failed request is retried up to `retries`
+    times unless it raised PermanentError, every attempt goes through the global rate limiter. Workers are started on the first request for a
+    chat and stop after `idle_timeout` without requests.
+    """
+
+    def __init__(self, chat_interval=1.0, global_rate=25, maxsize=100, idle_timeout=300, retries=5):
+        self.chat_interval = chat_interval
+        self.limiter = RateLimiter(global_rate)
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.retries = retries
+        self.queues = {}
+
+    async def enqueue(self, chat_id, request, on_done=None):
+        """Queue request for chat_id, waiting while its queue is full.
+
+        on_done is awaited with (result, None), or (None, last error) once the request failed for good.
+        """
+        queue = self.queues.get(chat_id)
+        if queue is None:
+            queue = self.queues[chat_id] = asyncio.Queue(self.maxsize)
+            asyncio.create_task(self._worker(chat_id, queue))
+        await queue.put((request, on_done))
+
+    async def _attempt(self, chat_id, request):
+        error = None
+        for attempt in range(self.retries):
+            await self.limiter.acquire()
+            try:
+                return await request(), None
+            except PermanentError as e:
+                logging.error("Request to chat %s failed permanently: %s", chat_id, e)
+                return None, e
+            except Exception as e:
+                error = e
+                logging.error("Request to chat %s failed (attempt %d): %s", chat_id, attempt + 1, e)
+                if attempt + 1 < self.retries:
+                    await asyncio.sleep(retry_delay(e, attempt))
+        return None, error
+
+    async def _worker(self, chat_id, queue):
+        while True:
+            try:
+                request, on_done = await asyncio.wait_for(queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    del self.queues[chat_id]
+                    return
+                continue
+
+            result, error = await self._attempt(chat_id, request)
+            if on_done is not None:
+                try:
+                    await on_done(result, error)
+                except Exception as e:
+                    logging.error("Error after a request to chat %s: %s", chat_id, e)
+            await asyncio.sleep(self.chat_interval)
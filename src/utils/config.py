@@ -22,3 +22,73 @@ WEIGHTS = {
     "txns_sells_m5": float(os.getenv("DEX_WEIGHT_TXNS_SELLS_M5", 0)),
     "txns_m5": float(os.getenv("DEX_WEIGHT_TXNS_M5", 0)),
 }
+
+THRESHOLD_SCORE = float(os.getenv("DEX_BOOSTED_TOKEN_THRESHOLD_SCORE", 0))
+
+# Optional JSON rules files, see rules.example.json. The shadow ruleset is evaluated alongside
+# the live one for comparison and never sends alerts.
+RULES_FILE = os.getenv("DEX_RULES_FILE")
+SHADOW_RULES_FILE = os.getenv("DEX_SHADOW_RULES_FILE")
+
+
+def parse_list(value, cast=str):
+    return [cast(item.strip()) for item in (value or "").split(",") if item.strip()]
+
+
+def parse_percentile(value):
+    """Turn a 0-100 percentile into the 0-1 fraction RpcPool expects, None when unset."""
+    if not value:
+        return None
+    percentile = float(value)
+    if not 0 < percentile <= 100:
+        raise ValueError(f"Percentile must be between 0 and 100, got {value}")
+    return percentile / 100
+
+
+# Several RPC endpoints per chain may be given comma separated, SOLANA_RPC_URL/ETHEREUM_RPC_URL still work.
+# *_RPC_CREDITS are per endpoint budgets of calls per minute in the same order, unset means unlimited.
+SOLANA_RPC_URLS = parse_list(os.getenv("SOLANA_RPC_URLS") or os.getenv("SOLANA_RPC_URL"))
+ETHEREUM_RPC_URLS = parse_list(os.getenv("ETHEREUM_RPC_URLS") or os.getenv("ETHEREUM_RPC_URL"))
+SOLANA_RPC_CREDITS = parse_list(os.getenv("SOLANA_RPC_CREDITS"), int)
+ETHEREUM_RPC_CREDITS = parse_list(os.getenv("ETHEREUM_RPC_CREDITS"), int)
+
+# Hedge reads slower than this latency percentile (0-100, e.g. 95) of their endpoint to a second endpoint,
+# unset disables
+RPC_HEDGE_PERCENTILE = parse_percentile(os.getenv("RPC_HEDGE_PERCENTILE"))
+
+# Comma separated monitors to start, see monitors/registry.py
+MONITORS = parse_list(os.getenv("MONITORS", "dexscreener"))
+
+# Run the solana/ethereum monitors as this many worker processes each, 0 keeps them in process.
+WALLET_SHARDS = int(os.getenv("WALLET_SHARDS", 0))
+# Optional JSON file {"solana": [...], "ethereum": [...]} watched for wallet changes in sharded mode
+WALLETS_FILE = os.getenv("WALLETS_FILE")
+PURCHASE_AGGREGATION_WINDOW = int(os.getenv("PURCHASE_AGGREGATION_WINDOW", 30))
+
+# Capacity of each event bus queue, publishers wait while it is full
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", 1000))
+# Optional write-ahead log of unsent alerts and unaggregated purchases, replayed on restart
+EVENT_LOG_FILE = os.getenv("EVENT_LOG_FILE")
+
+# Concurrent on-chain analyses of Solana alerts, opt-in as each one scans the token program for holders
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", 0))
+ENRICHMENT_TTL = int(os.getenv("ENRICHMENT_TTL", 3600))
+# Transactions fetched per analysis for active addresses and again for liquidity events
+ENRICHMENT_MAX_TRANSACTIONS = int(os.getenv("ENRICHMENT_MAX_TRANSACTIONS", 50))
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Detailed per token filter/score lines (debug level) allowed per minute
+TOKEN_LOG_RATE = int(os.getenv("TOKEN_LOG_RATE", 10))
+
+# Optional JSON list of per chat subscriptions, without it every alert goes to TELEGRAM_CHAT_ID
+SUBSCRIPTIONS_FILE = os.getenv("SUBSCRIPTIONS_FILE")
+# Minimum seconds between messages to one chat and messages per second across all chats
+CHAT_SEND_INTERVAL = float(os.getenv("CHAT_SEND_INTERVAL", 1.0))
+GLOBAL_SEND_RATE = float(os.getenv("GLOBAL_SEND_RATE", 25))
+
+# Per cycle stage timings and stack samples, also toggled at runtime with SIGUSR1
+PROFILE_CYCLES = os.getenv("PROFILE_CYCLES", "false").lower() in ("1", "true", "yes")
+# Collapsed stack profiles of the PROFILE_SLOWEST slowest cycles per monitor are kept in PROFILE_DIR
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SLOWEST = int(os.getenv("PROFILE_SLOWEST", 5))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))
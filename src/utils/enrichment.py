@@ -0,0 +1,73 @@
+import asyncio
+import logging
+
+from utils.ttl_cache import TTLCache
+
+
+def format_analytics(analytics):
+    holders = analytics.get("holders_distribution") or {}
+    message = "\n\n🧬 **On-chain Analytics**\n"
+    if holders:
+        message += f"👥 **Holders:** {holders['total_holders']:,}\n"
+        message += f"🏦 **Top 10 Holders:** {holders['top_10_percentage']:.2f}%\n"
+        message += f"⚖️ **Concentration Index:** {holders['concentration_index']:.4f}\n"
+    message += f"🔄 **Daily Active Addresses:** {analytics.get('daily_active_addresses', 0):,}\n"
+    message += f"💧 **Liquidity Events (7D):** {len(analytics.get('liquidity_history') or [])}"
+    return message
+
+
+class TokenEnricher:
+    """Adds on-chain analytics to Solana alerts after they were sent.
+
+    Registered as a Notifier listener, so alerts go out immediately and are edited once the analytics are in.
+    Results are cached per mint for `ttl` seconds and concurrent alerts for one mint share a single analysis.
+    """
+
+    def __init__(self, notifier, analytics, workers=2, ttl=3600, maxsize=100):
+        self.notifier = notifier
+        self.analytics = analytics
+        self.workers = workers
+        self.cache = TTLCache(ttl)
+        self.queue = asyncio.Queue(maxsize)
+        self.waiting = {}
+
+    async def on_delivered(self, event, sent_message):
+        if event.chain != "solana" or not event.token_address:
+            return
+
+        mint = event.token_address
+        if mint in self.waiting:
+            self.waiting[mint].append((event, sent_message))
+            return
+
+        try:
+            self.queue.put_nowait(mint)
+        except asyncio.QueueFull:
+            logging.info(f"Enrichment queue full, skipping {mint}")
+            return
+        self.waiting[mint] = [(event, sent_message)]
+
+    async def enrich(self, mint):
+        analytics = self.cache.get(mint)
+        if analytics is None:
+            analytics = await self.analytics.get_token_analytics(mint)
+            if analytics is None:
+                return None
+            self.cache.set(mint, analytics)
+        return analytics
+
+    async def worker(self):
+        while True:
+            mint = await self.queue.get()
+            try:
+                analytics = await self.enrich(mint)
+            except Exception as e:
+                logging.error(f"Error enriching {mint}: {e}")
+                analytics = None
+
+            for event, sent_message in self.waiting.pop(mint, []):
+                if analytics is not None:
+                    await self.notifier.edit_message(sent_message, event.text + format_analytics(analytics))
+
+    async def run(self):
+        await asyncio.gather(*(self.worker() for _ in range(self.workers)))
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+import struct
+
+from utils.events import EVENT_TYPES, EVENT_TAGS
+
+# Record header of the event log: type tag (0 acknowledges seq), sequence number, payload length
+_RECORD_HEADER = struct.Struct("<BQI")
+ACK_TAG = 0
+# Marks part of an event's handling as done, the payload is a consumer defined key such as a chat id
+MARK_TAG = 255
+# The log is rewritten with only the outstanding records once it grows past this and twice their size
+COMPACT_BYTES = 1024 * 1024
+HANDLER_RETRIES = 3
+
+
+class EventLog:
+    """Append-only write-ahead log of events that have not been acknowledged by their consumer yet."""
+
+    def __init__(self, path):
+        self.path = path
+        # Unacknowledged seqs and the keys marked done for each
+        self.outstanding = {}
+        # Encoded event record of every outstanding seq, kept for compaction
+        self.records = {}
+        self.file = None
+        self.compacted_size = 0
+
+    def open(self):
+        """Load unacknowledged events, compact the log and return them in publish order."""
+        records = {}
+        marks = {}
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+
+        offset = 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            tag, seq, length = _RECORD_HEADER.unpack_from(data, offset)
+            offset += _RECORD_HEADER.size
+            if offset + length > len(data):
+                # Torn final write from a crash
+                break
+            if tag == ACK_TAG:
+                records.pop(seq, None)
+                marks.pop(seq, None)
+            elif tag == MARK_TAG:
+                marks.setdefault(seq, set()).add(bytes(data[offset:offset + length]).decode())
+            elif tag in EVENT_TYPES:
+                records[seq] = (tag, bytes(data[offset:offset + length]))
+            offset += length
+
+        events = [(seq, EVENT_TYPES[tag].decode(payload)) for seq, (tag, payload) in records.items()]
+        self.records = {seq: _RECORD_HEADER.pack(tag, seq, len(payload)) + payload
+                        for seq, (tag, payload) in records.items()}
+        self.outstanding = {seq: marks.get(seq, set()) for seq in records}
+        self.compact()
+        return events
+
+    def compact(self):
+        """Rewrite the log with only the outstanding events and their marks."""
+        if self.file is not None:
+            self.file.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            for seq, record in self.records.items():
+                f.write(record)
+                for key in self.outstanding[seq]:
+                    f.write(self._mark_record(seq, key))
+        os.replace(tmp_path, self.path)
+        self.file = open(self.path, "ab")
+        self.compacted_size = self.file.tell()
+
+    @staticmethod
+    def _mark_record(seq, key):
+        payload = key.encode()
+        return _RECORD_HEADER.pack(MARK_TAG, seq, len(payload)) + payload
+
+    def append(self, seq, event):
+        payload = event.encode()
+        record = _RECORD_HEADER.pack(EVENT_TAGS[type(event)], seq, len(payload)) + payload
+        self.file.write(record)
+        self.file.flush()
+        self.records[seq] = record
+        self.outstanding[seq] = set()
+
+    def mark(self, seq, key):
+        marked = self.outstanding.get(seq)
+        if marked is None or key in marked:
+            return
+        marked.add(key)
+        self.file.write(self._mark_record(seq, key))
+        self.file.flush()
+
+    def ack(self, seq):
+        if seq not in self.outstanding:
+            return
+        del self.outstanding[seq]
+        del self.records[seq]
+        self.file.write(_RECORD_HEADER.pack(ACK_TAG, seq, 0))
+        self.file.flush()
+        # Events stuck unacknowledged must not keep the acknowledged ones on disk
+        if self.file.tell() > max(COMPACT_BYTES, 2 * self.compacted_size):
+            self.compact()
+
+
+class EventBus:
+    """Typed event queues between monitors and consumers.
+
+    Every event type has its own bounded queue, so a slow consumer makes `publish` wait instead of growing memory.
+    With an event log, events are acknowledged once their handler succeeds and unacknowledged ones are
+    replayed on the next start.
+    """
+
+    def __init__(self, maxsize=1000, log_path=None):
+        self.maxsize = maxsize
+        self.queues = {}
+        self.handlers = {}
+        self.log = EventLog(log_path) if log_path else None
+        self.replayed = self.log.open() if self.log else []
+        self.seq = self.replayed[-1][0] if self.replayed else 0
+
+    def subscribe(self, event_type, handler, auto_ack=True):
+        """Register the single consumer of an event type. Without auto_ack the handler acks by seq itself."""
+        self.handlers[event_type] = (handler, auto_ack)
+        self.queues[event_type] = asyncio.Queue(self.maxsize)
+
+    async def publish(self, event):
+        self.seq += 1
+        if self.log:
+            self.log.append(self.seq, event)
+        await self.queues[type(event)].put((self.seq, event))
+
+    def ack(self, seq):
+        if self.log:
+            self.log.ack(seq)
+
+    def mark(self, seq, key):
+        """Record that `key` of an event is handled, e.g. one of its recipients, so a replay can skip it."""
+        if self.log:
+            self.log.mark(seq, key)
+
+    def marked(self, seq):
+        """Keys marked for an unacknowledged event, including those marked before a restart."""
+        if self.log:
+            return set(self.log.outstanding.get(seq, ()))
+        return set()
+
+    async def _consume(self, event_type):
+        handler, auto_ack = self.handlers[event_type]
+        queue = self.queues[event_type]
+        while True:
+            seq, event = await queue.get()
+            for attempt in range(HANDLER_RETRIES):
+                try:
+                    await handler(event, seq)
+                    if auto_ack:
+                        self.ack(seq)
+                    break
+                except Exception as e:
+                    logging.error(f"{event_type.__name__} handler error (attempt {attempt + 1}): {e}")
+                    await asyncio.sleep(2 ** attempt)
+            else:
+                logging.error(f"Giving up on {event_type.__name__} {seq}, it is replayed on the next start")
+            queue.task_done()
+
+    async def run(self):
+        consumers = [asyncio.create_task(self._consume(event_type)) for event_type in self.handlers]
+        if self.replayed:
+            logging.info(f"Replaying {len(self.replayed)} unacknowledged events")
+        replayed, self.replayed = self.replayed, []
+        for seq, event in replayed:
+            await self.queues[type(event)].put((seq, event))
+        await asyncio.gather(*consumers)
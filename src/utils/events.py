@@ -0,0 +1,65 @@
+import struct
+from typing import NamedTuple, Tuple
+
+_PURCHASE_HEADER = struct.Struct("<dd5H")
+_ALERT_HEADER = struct.Struct("<dHHHI")
+
+
+def _pack_strings(header, numbers, strings):
+    parts = [value.encode() for value in strings]
+    return header.pack(*numbers, *map(len, parts)) + b"".join(parts)
+
+
+def _unpack_strings(header, data, count):
+    view = memoryview(data)
+    values = header.unpack_from(view)
+    numbers, lengths = values[:-count], values[-count:]
+    offset = header.size
+    strings = []
+    for length in lengths:
+        strings.append(str(view[offset:offset + length], "utf-8"))
+        offset += length
+    return numbers, strings
+
+
+class PurchaseEvent(NamedTuple):
+    chain: str
+    wallet: str
+    token_name: str
+    token_address: str
+    amount: float
+    quantity: float
+    tx_hash: str
+
+    def encode(self):
+        """Pack into a compact binary record, used instead of pickle between processes and in the event log."""
+        return _pack_strings(_PURCHASE_HEADER, (self.amount, self.quantity),
+                             (self.chain, self.wallet, self.token_name, self.token_address, self.tx_hash))
+
+    @classmethod
+    def decode(cls, data):
+        (amount, quantity), (chain, wallet, token_name, token_address, tx_hash) = _unpack_strings(
+            _PURCHASE_HEADER, data, 5)
+        return cls(chain, wallet, token_name, token_address, amount, quantity, tx_hash)
+
+
+class AlertEvent(NamedTuple):
+    chain: str
+    token_address: str
+    score: float
+    wallets: Tuple[str, ...]
+    text: str
+
+    def encode(self):
+        return _pack_strings(_ALERT_HEADER, (self.score,),
+                             (self.chain, self.token_address, ",".join(self.wallets), self.text))
+
+    @classmethod
+    def decode(cls, data):
+        (score,), (chain, token_address, wallets, text) = _unpack_strings(_ALERT_HEADER, data, 4)
+        return cls(chain, token_address, score, tuple(filter(None, wallets.split(","))), text)
+
+
+# Stable type tags of the events that can be written to the event log
+EVENT_TYPES = {1: PurchaseEvent, 2: AlertEvent}
+EVENT_TAGS = {event_type: tag for tag, event_type in EVENT_TYPES.items()}
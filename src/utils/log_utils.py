@@ -0,0 +1,77 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import time
+from collections import Counter
+
+LOG_FORMAT = "%(asctime)s - %(message)s"
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Leave msg % args and traceback formatting to the listener thread
+        return record
+
+
+def setup_logging(level="INFO", fmt=LOG_FORMAT):
+    """Send log records through a queue so formatting and stream I/O happen on a background thread."""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt))
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers[:] = [_DeferredQueueHandler(log_queue)]
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class RateLimitedSampler:
+    """Allows at most `limit` detailed log lines per `interval` seconds and counts the ones it drops."""
+
+    def __init__(self, limit, interval=60, level=logging.DEBUG):
+        self.limit = limit
+        self.level = level
+        self.interval = interval
+        self.window_started_at = time.monotonic()
+        self.allowed = 0
+        self.suppressed = 0
+
+    def allow(self):
+        if not logging.getLogger().isEnabledFor(self.level):
+            return False
+
+        now = time.monotonic()
+        if now - self.window_started_at >= self.interval:
+            if self.suppressed:
+                logging.debug("%d detailed log lines suppressed in the last %ds", self.suppressed, self.interval)
+            self.window_started_at = now
+            self.allowed = 0
+            self.suppressed = 0
+
+        if self.allowed < self.limit:
+            self.allowed += 1
+            return True
+        self.suppressed += 1
+        return False
+
+
+class RejectionCounter:
+    """Counts rejections by reason so a cycle logs one summary line instead of a line per token."""
+
+    def __init__(self, name):
+        self.name = name
+        self.counts = Counter()
+
+    def add(self, reason):
+        self.counts[reason] += 1
+
+    def log_summary(self):
+        if not self.counts:
+            return
+        reasons = ", ".join(f"{reason}={count}" for reason, count in self.counts.most_common())
+        logging.info("%s rejected %d tokens: %s", self.name, sum(self.counts.values()), reasons)
+        self.counts.clear()
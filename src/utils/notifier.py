@@ -1,14 +1,97 @@
-from telegram import Bot
-from telegram.constants import ParseMode
+import functools
+import logging
+
+from utils.chat_queues import ChatQueues, PermanentError
+from utils.subscriptions import SubscriptionIndex
 
 
 class Notifier:
-    def __init__(self, token, chat_id):
-        self.bot = Bot(token=token)
+    def __init__(self, token, chat_id, subscriptions=None, bus=None, chat_interval=1.0, global_rate=25):
+        self.token = token
         self.chat_id = chat_id
+        self.subscriptions = subscriptions if subscriptions is not None else SubscriptionIndex.load(None, chat_id)
+        # EventBus the alerts come from, chats that got an alert are marked on it until it is acknowledged
+        self.bus = bus
+        self.chat_queues = ChatQueues(chat_interval, global_rate)
+        self._bot = None
+        # Coroutines called with (event, sent message) after an alert is delivered to a chat
+        self.listeners = []
+
+    @property
+    def bot(self):
+        # python-telegram-bot is heavy to import, defer it until the first message
+        if self._bot is None:
+            from telegram import Bot
+            self._bot = Bot(token=self.token)
+        return self._bot
 
-    async def send_message(self, message):
+    async def _call(self, method, **kwargs):
+        """Call a bot method, errors that retrying cannot fix are raised as PermanentError."""
+        from telegram.error import BadRequest, Forbidden
         try:
-            await self.bot.send_message(chat_id=self.chat_id, text=message, parse_mode=ParseMode.MARKDOWN)
-        except Exception as e:
-            print(f"Notifier error: {e}")
+            return await method(**kwargs)
+        except Forbidden as e:
+            # The bot was blocked or removed from the chat
+            raise PermanentError(e, chat_gone=True) from e
+        except BadRequest as e:
+            # Either the chat is gone or the request itself is invalid, neither changes on retry
+            raise PermanentError(e, chat_gone="chat not found" in str(e).lower()) from e
+
+    async def send_message(self, message, chat_id=None):
+        """Return the sent telegram Message, transient errors are left to the chat queue to retry."""
+        from telegram.constants import ParseMode
+        return await self._call(self.bot.send_message, chat_id=chat_id or self.chat_id, text=message,
+                                parse_mode=ParseMode.MARKDOWN)
+
+    async def edit_message(self, sent_message, text):
+        """Queue an edit behind the chat's other requests, so it shares their rate limits and retries."""
+        await self.chat_queues.enqueue(str(sent_message.chat_id), functools.partial(self._edit, sent_message, text))
+
+    async def _edit(self, sent_message, text):
+        from telegram.constants import ParseMode
+        return await self._call(self.bot.edit_message_text, text=text, chat_id=sent_message.chat_id,
+                                message_id=sent_message.message_id, parse_mode=ParseMode.MARKDOWN)
+
+    async def deliver(self, event, seq):
+        """EventBus handler for AlertEvent, fans the alert out to the matching chats' send queues.
+
+        Waits while a chat's queue is full, so a backlog backs up into the bus. Every chat that got the alert, or
+        failed permanently, is marked on the bus and the alert is acknowledged once all are, a replay only goes
+        to the chats missing. Chats the bot can no longer reach are unsubscribed.
+        """
+        chat_ids = self.subscriptions.match(event)
+        if self.bus is not None:
+            chat_ids -= self.bus.marked(seq)
+        if not chat_ids:
+            self._ack(seq)
+            return
+
+        delivery = {"remaining": len(chat_ids), "failed": False}
+        for chat_id in chat_ids:
+            await self.chat_queues.enqueue(chat_id, functools.partial(self.send_message, event.text, chat_id),
+                                           functools.partial(self._on_sent, event, seq, chat_id, delivery))
+
+    async def _on_sent(self, event, seq, chat_id, delivery, sent_message, error):
+        delivery["remaining"] -= 1
+        if isinstance(error, PermanentError):
+            if self.bus is not None:
+                self.bus.mark(seq, chat_id)
+            if error.chat_gone:
+                logging.info("Unsubscribing unreachable chat %s", chat_id)
+                self.subscriptions.unsubscribe(chat_id)
+        elif sent_message is None:
+            delivery["failed"] = True
+        else:
+            if self.bus is not None:
+                self.bus.mark(seq, chat_id)
+            for listener in self.listeners:
+                try:
+                    await listener(event, sent_message)
+                except Exception as e:
+                    logging.error("Notifier listener error: %s", e)
+        if delivery["remaining"] == 0 and not delivery["failed"]:
+            self._ack(seq)
+
+    def _ack(self, seq):
+        if self.bus is not None:
+            self.bus.ack(seq)
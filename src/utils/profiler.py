@@ -0,0 +1,187 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+_current_cycle = contextvars.ContextVar("current_cycle", default=None)
+_NULL_STAGE = contextlib.nullcontext()
+LAG_PROBE_INTERVAL = 0.05
+
+
+class CycleRecord:
+    """Timings of one monitor cycle. Stages are exclusive, a nested stage pauses the one around it."""
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.stack = []
+        self.mark = None
+        self.max_lag = 0.0
+        self.samples = Counter()
+
+    def _charge(self, wall, cpu):
+        stage = self.stack[-1]
+        wall_total, cpu_total = self.stages.get(stage, (0.0, 0.0))
+        self.stages[stage] = (wall_total + wall - self.mark[0], cpu_total + cpu - self.mark[1])
+
+    def enter(self, stage):
+        now = (time.perf_counter(), time.thread_time())
+        if self.stack:
+            self._charge(*now)
+        self.stack.append(stage)
+        self.mark = now
+
+    def exit(self):
+        now = (time.perf_counter(), time.thread_time())
+        self._charge(*now)
+        self.stack.pop()
+        self.mark = now
+
+
+class _Stage:
+    __slots__ = ("record", "name")
+
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        self.record.enter(self.name)
+
+    def __exit__(self, *exc):
+        self.record.exit()
+
+
+def stage(name):
+    """Time a block as stage `name` of the cycle being profiled, a no-op outside profiled cycles."""
+    record = _current_cycle.get()
+    if record is None:
+        return _NULL_STAGE
+    return _Stage(record, name)
+
+
+def fold_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class CycleProfiler:
+    """Opt-in per cycle profiling of TaskManager cycles.
+
+    While enabled, every cycle logs its wall and CPU time per stage and the worst event loop lag seen during it,
+    and a background thread samples the loop thread's stack. The samples of the `slowest` cycles per monitor
+    are kept in `output_dir` as collapsed stacks ("frame;frame;frame count"), the input of flamegraph.pl and
+    speedscope. CPU time is the loop thread's, so it includes other tasks interleaved with the stage.
+    """
+
+    def __init__(self, enabled=False, output_dir="profiles", slowest=5, sample_interval=0.005):
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.slowest = slowest
+        self.sample_interval = sample_interval
+        self.active = set()
+        self.lock = threading.Lock()
+        self.sampler = None
+        self.lag_probe = None
+        self.loop_thread_id = None
+        # Per monitor min heap of (wall time, profile path) of the slowest cycles kept on disk
+        self.kept = {}
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        logging.info("Cycle profiling %s", "enabled" if self.enabled else "disabled")
+
+    def install_signal_handler(self, signum=signal.SIGUSR1):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signum, self.toggle)
+        except (NotImplementedError, AttributeError, RuntimeError) as e:
+            logging.error("Cannot install profiler signal handler: %s", e)
+
+    async def run_cycle(self, name, cycle, interval):
+        if not self.enabled:
+            return await cycle()
+
+        record = CycleRecord(name)
+        token = _current_cycle.set(record)
+        self._start(record)
+        started_at = time.perf_counter()
+        cpu_started_at = time.thread_time()
+        record.enter("other")
+        try:
+            return await cycle()
+        finally:
+            record.exit()
+            wall = time.perf_counter() - started_at
+            cpu = time.thread_time() - cpu_started_at
+            _current_cycle.reset(token)
+            with self.lock:
+                self.active.discard(record)
+            self._report(record, wall, cpu, interval)
+
+    def _start(self, record):
+        self.loop_thread_id = threading.get_ident()
+        with self.lock:
+            self.active.add(record)
+        if self.sampler is None or not self.sampler.is_alive():
+            self.sampler = threading.Thread(target=self._sample, name="cycle-profiler", daemon=True)
+            self.sampler.start()
+        if self.lag_probe is None or self.lag_probe.done():
+            self.lag_probe = asyncio.ensure_future(self._probe_lag())
+
+    def _sample(self):
+        while True:
+            with self.lock:
+                if not self.active:
+                    return
+                frame = sys._current_frames().get(self.loop_thread_id)
+                if frame is not None:
+                    folded = fold_stack(frame)
+                    for record in self.active:
+                        record.samples[folded] += 1
+            del frame
+            time.sleep(self.sample_interval)
+
+    async def _probe_lag(self):
+        loop = asyncio.get_running_loop()
+        while self.active:
+            expected = loop.time() + LAG_PROBE_INTERVAL
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            lag = loop.time() - expected
+            for record in list(self.active):
+                record.max_lag = max(record.max_lag, lag)
+
+    def _report(self, record, wall, cpu, interval):
+        stages = ", ".join(
+            f"{stage_name}={stage_wall * 1000:.0f}ms/{stage_cpu * 1000:.0f}ms"
+            for stage_name, (stage_wall, stage_cpu) in sorted(record.stages.items(), key=lambda item: -item[1][0])
+        )
+        log = logging.warning if interval and wall > interval else logging.info
+        log("%s cycle %.0fms wall, %.0fms cpu, max loop lag %.0fms: %s",
+            record.name, wall * 1000, cpu * 1000, record.max_lag * 1000, stages)
+
+        kept = self.kept.setdefault(record.name, [])
+        if not record.samples or (len(kept) >= self.slowest and wall <= kept[0][0]):
+            return
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{record.name}-{time.time_ns()}-{wall * 1000:.0f}ms.folded")
+        with open(path, "w") as f:
+            for folded, count in record.samples.items():
+                f.write(f"{folded} {count}\n")
+
+        heapq.heappush(kept, (wall, path))
+        if len(kept) > self.slowest:
+            _, evicted = heapq.heappop(kept)
+            with contextlib.suppress(OSError):
+                os.remove(evicted)
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+
+from utils.events import AlertEvent
+
+CURRENCIES = {"solana": "SOL", "ethereum": "ETH"}
+# Purchases listed in full per alert, about 200 characters each against Telegram's 4096 character limit
+MAX_LISTED_PURCHASES = 10
+
+
+class PurchaseAggregator:
+    """Groups smart wallet purchases by token and publishes one alert per token for each window.
+
+    The window starts with the first purchase after a flush. Purchases are acknowledged on the bus only once
+    the alert carrying them has been published, so they survive a restart in between.
+    """
+
+    def __init__(self, bus, window=30):
+        self.bus = bus
+        self.window = window
+        self.pending = {}
+        self.pending_seqs = []
+
+    async def add(self, event, seq):
+        if not self.pending:
+            asyncio.get_running_loop().call_later(self.window, lambda: asyncio.ensure_future(self.flush()))
+        self.pending.setdefault((event.chain, event.token_address), []).append(event)
+        self.pending_seqs.append(seq)
+
+    async def flush(self):
+        pending, self.pending = self.pending, {}
+        seqs, self.pending_seqs = self.pending_seqs, []
+        try:
+            for (chain, token_address), events in pending.items():
+                wallets = tuple(dict.fromkeys(event.wallet for event in events))
+                await self.bus.publish(AlertEvent(chain, token_address, 0.0, wallets, self.format_message(events)))
+            for seq in seqs:
+                self.bus.ack(seq)
+        except Exception as e:
+            logging.error(f"PurchaseAggregator error: {e}")
+
+    def format_message(self, events):
+        first = events[0]
+        currency = CURRENCIES.get(first.chain, first.chain)
+        total = sum(event.amount for event in events)
+
+        message = f"🔥 **[FOMO Signal]** ${first.token_name} ({len(events)} Smart Wallet Purchase)\n\n"
+        message += f"**Chain:** {first.chain.capitalize()}\n"
+        message += f"**Contract Address:** `{first.token_address}`\n\n"
+        for event in events[:MAX_LISTED_PURCHASES]:
+            message += f"🟢 **Wallet:** `{event.wallet}`\n"
+            message += f"**Spent:** `{event.amount:.4f}` {currency}\n"
+            message += f"**Purchase:** `{event.quantity:.2f}` {event.token_name}\n"
+            message += f"**Tx:** `{event.tx_hash}`\n\n"
+        if len(events) > MAX_LISTED_PURCHASES:
+            message += f"➕ **+{len(events) - MAX_LISTED_PURCHASES} more purchases**\n\n"
+        message += f"**Total Spent:** `{total:.2f}` {currency}\n"
+        return message
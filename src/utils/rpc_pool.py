@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+EWMA_ALPHA = 0.2
+UNHEALTHY_ERROR_RATE = 0.5
+UNHEALTHY_COOLDOWN = 30
+LATENCY_WINDOW = 100
+MIN_HEDGE_SAMPLES = 20
+
+
+class RpcUnavailable(Exception):
+    pass
+
+
+class CreditBudget:
+    """Calls per `window` seconds allowed on one endpoint URL."""
+
+    def __init__(self, credits, window=60):
+        self.credits = credits
+        self.window = window
+        self.used = 0
+        self.window_started_at = time.monotonic()
+
+    def has_credits(self, cost, now):
+        if now - self.window_started_at >= self.window:
+            self.window_started_at = now
+            self.used = 0
+        return self.used + cost <= self.credits
+
+    def reset_in(self, now):
+        return max(0.0, self.window_started_at + self.window - now)
+
+    def charge(self, cost):
+        self.used += cost
+
+
+# Budgets by URL, every pool of the process calling an endpoint draws from the same one
+_budgets = {}
+
+
+def credit_budget(url, credits, window=60):
+    budget = _budgets.get(url)
+    if budget is None:
+        budget = _budgets[url] = CreditBudget(credits, window)
+    return budget
+
+
+def split_credits(credits, parts):
+    """Divide per endpoint budgets between `parts` processes calling the same endpoints."""
+    return [max(1, credit // parts) if credit else credit for credit in credits]
+
+
+class Endpoint:
+    def __init__(self, url, client, credits=None, credit_window=60):
+        self.url = url
+        self.client = client
+        self.budget = credit_budget(url, credits, credit_window) if credits else None
+        self.latency_ewma = 0.0
+        self.error_ewma = 0.0
+        self.last_error_at = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def has_credits(self, cost, now):
+        return self.budget is None or self.budget.has_credits(cost, now)
+
+    def credits_reset_in(self, now):
+        return self.budget.reset_in(now) if self.budget is not None else 0.0
+
+    def charge(self, cost):
+        if self.budget is not None:
+            self.budget.charge(cost)
+
+    def healthy(self, now):
+        # An endpoint that kept failing is probed again once the cooldown has passed
+        return self.error_ewma < UNHEALTHY_ERROR_RATE or now - self.last_error_at > UNHEALTHY_COOLDOWN
+
+    def record(self, latency, error=False):
+        self.error_ewma += EWMA_ALPHA * ((1.0 if error else 0.0) - self.error_ewma)
+        if error:
+            # A fast 429 or error page says nothing about how quickly the endpoint answers real requests
+            self.last_error_at = time.monotonic()
+            return
+
+        self.latencies.append(latency)
+        if len(self.latencies) == 1:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += EWMA_ALPHA * (latency - self.latency_ewma)
+
+    def record_lower_bound(self, elapsed):
+        """A cancelled call took at least `elapsed`, which can only raise the estimate."""
+        if elapsed > self.latency_ewma:
+            self.latency_ewma += EWMA_ALPHA * (elapsed - self.latency_ewma)
+
+    def latency_percentile(self, percentile):
+        if len(self.latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        index = int(percentile * (len(ordered) - 1))
+        return ordered[min(max(index, 0), len(ordered) - 1)]
+
+
+class RpcPool:
+    """Routes RPC calls to the fastest healthy endpoint of a chain.
+
+    `fn` passed to `call` receives the endpoint's client. Clients of blocking libraries (solana.rpc.api.Client,
+    Web3) are called in a worker thread, async clients are awaited directly. With `hedge_percentile` set, a
+    fraction between 0 and 1, a read that outlives that latency percentile of its endpoint is repeated on the next
+    best endpoint and the first answer wins. Credit budgets are per endpoint URL and shared by every pool of the
+    process, so separate pools for one chain never exceed an endpoint's budget together.
+    """
+
+    def __init__(self, name, endpoints, blocking=True, hedge_percentile=None):
+        if not endpoints:
+            raise ValueError(f"No {name} RPC endpoints configured")
+        self.name = name
+        self.endpoints = endpoints
+        self.blocking = blocking
+        self.hedge_percentile = hedge_percentile
+
+    @classmethod
+    def from_urls(cls, name, urls, client_factory, credits=None, **kwargs):
+        credits = credits or []
+        endpoints = [
+            Endpoint(url, client_factory(url), credits[i] if i < len(credits) and credits[i] else None)
+            for i, url in enumerate(urls)
+        ]
+        return cls(name, endpoints, **kwargs)
+
+    def _ranked(self, exclude, cost, now):
+        candidates = [e for e in self.endpoints if e not in exclude and e.has_credits(cost, now)]
+        return sorted(candidates, key=lambda e: (not e.healthy(now), e.latency_ewma))
+
+    async def _acquire(self, exclude, cost):
+        while True:
+            now = time.monotonic()
+            ranked = self._ranked(exclude, cost, now)
+            if ranked:
+                endpoint = ranked[0]
+                endpoint.charge(cost)
+                return endpoint
+
+            remaining = [e for e in self.endpoints if e not in exclude]
+            if not remaining:
+                return None
+            # Every untried endpoint is out of credits, wait for the first budget window to roll over
+            wait = min(e.credits_reset_in(now) for e in remaining)
+            logging.info(f"{self.name} RPC credits exhausted, waiting {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+    async def _call_endpoint(self, endpoint, fn):
+        started_at = time.perf_counter()
+        try:
+            if self.blocking:
+                result = await asyncio.to_thread(fn, endpoint.client)
+            else:
+                result = await fn(endpoint.client)
+        except asyncio.CancelledError:
+            # Lost a hedge race. A slow primary is penalised, a backup cancelled right after it started is not
+            endpoint.record_lower_bound(time.perf_counter() - started_at)
+            raise
+        except Exception:
+            endpoint.record(time.perf_counter() - started_at, error=True)
+            raise
+
+        endpoint.record(time.perf_counter() - started_at)
+        return result
+
+    async def _call_hedged(self, primary, fn, cost, tried):
+        deadline = primary.latency_percentile(self.hedge_percentile)
+        if deadline is None:
+            return await self._call_endpoint(primary, fn)
+
+        first = asyncio.ensure_future(self._call_endpoint(primary, fn))
+        done, _ = await asyncio.wait({first}, timeout=deadline)
+        ranked = self._ranked(tried, cost, time.monotonic())
+        if done or not ranked:
+            return await first
+
+        backup = ranked[0]
+        backup.charge(cost)
+        tried.add(backup)
+        pending = {first, asyncio.ensure_future(self._call_endpoint(backup, fn))}
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for task_pending in pending:
+                        task_pending.cancel()
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    async def call(self, fn, cost=1, hedge=True):
+        tried = set()
+        last_error = None
+        while True:
+            endpoint = await self._acquire(tried, cost)
+            if endpoint is None:
+                break
+            tried.add(endpoint)
+            try:
+                if hedge and self.hedge_percentile:
+                    return await self._call_hedged(endpoint, fn, cost, tried)
+                return await self._call_endpoint(endpoint, fn)
+            except Exception as e:
+                last_error = e
+                logging.error(f"{self.name} RPC {endpoint.url} error: {e}")
+
+        raise last_error or RpcUnavailable(f"No {self.name} RPC endpoint available")
@@ -0,0 +1,226 @@
+import ast
+import json
+import logging
+import os
+import time
+
+from utils.config import MAX_VALUES, WEIGHTS, THRESHOLD_SCORE
+from utils.profiler import stage
+
+# Every name a rule expression may reference, with the code that extracts it from a DexScreener pair.
+# Only the fields a ruleset actually uses are extracted by its compiled evaluator.
+FIELDS = {
+    "liquidity_usd": 'token_data.get("liquidity", {}).get("usd", 0)',
+    "fdv": 'token_data.get("fdv", 0) or 1',
+    "token_age": '_now() - token_data.get("pairCreatedAt", 0) / 1000',
+    "volume_m5": 'token_data.get("volume", {}).get("m5", 0)',
+    "volume_h24": 'token_data.get("volume", {}).get("h24", 0)',
+    "price_change_m5": 'token_data.get("priceChange", {}).get("m5", 0)',
+    "price_change_h1": 'token_data.get("priceChange", {}).get("h1", 0)',
+    "price_change_h6": 'token_data.get("priceChange", {}).get("h6", 0)',
+    "price_change_h24": 'token_data.get("priceChange", {}).get("h24", 0)',
+    "txns_buys_m5": 'token_data.get("txns", {}).get("m5", {}).get("buys", 0)',
+    "txns_sells_m5": 'token_data.get("txns", {}).get("m5", {}).get("sells", 0)',
+    "txns_m5": 'token_data.get("txns", {}).get("m5", {}).get("buys", 0)'
+               ' + token_data.get("txns", {}).get("m5", {}).get("sells", 0)',
+    "txns_buys_h1": 'token_data.get("txns", {}).get("h1", {}).get("buys", 0)',
+    "txns_buys_h24": 'token_data.get("txns", {}).get("h24", {}).get("buys", 0)',
+    "socials": 'len(token_data.get("info", {}).get("socials") or [])',
+}
+
+FUNCTIONS = {"min": min, "max": max, "abs": abs}
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Compare, ast.Eq, ast.NotEq, ast.Lt,
+    ast.LtE, ast.Gt, ast.GtE, ast.Call, ast.Name, ast.Load, ast.Constant,
+)
+
+# Mirrors the thresholds the former TokenFilter hard-coded and the env driven MAX_VALUES/WEIGHTS,
+# so running without a rules file behaves as before.
+DEFAULT_RULES = {
+    "threshold_score": THRESHOLD_SCORE,
+    "filters": [
+        {"name": "liquidity", "expr": "liquidity_usd >= 80000 and volume_h24 >= 10000"},
+        {"name": "buys_h24", "expr": "txns_buys_h24 >= 20"},
+        {"name": "price_change", "expr": "price_change_m5 >= 0.5 or price_change_h1 >= 0.5"
+                                         " or price_change_h6 >= 0.5 or price_change_h24 >= 0.5"},
+        {"name": "bot_volume", "expr": "not (volume_m5 > 0.5 * volume_h24 and txns_m5 < 10)"},
+        {"name": "socials", "expr": "socials > 0"},
+    ],
+    "max_values": MAX_VALUES,
+    "weights": WEIGHTS,
+    "bonuses": [
+        {"name": "buys_ratio", "expr": "txns_buys_m5 / max(txns_sells_m5, 1) > 2", "points": 5},
+    ],
+}
+
+
+# Version recorded for a rules file that could not be found
+MISSING = object()
+
+
+class RuleError(ValueError):
+    pass
+
+
+def parse_expression(expr, names):
+    try:
+        tree = ast.parse(expr, mode="eval")
+    except SyntaxError as e:
+        raise RuleError(f"invalid expression {expr!r}: {e}")
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise RuleError(f"unsupported syntax {type(node).__name__} in {expr!r}")
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS):
+            raise RuleError(f"unsupported call in {expr!r}")
+        if isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+            if node.id not in FIELDS:
+                raise RuleError(f"unknown field {node.id!r} in {expr!r}")
+            names.add(node.id)
+
+    return ast.unparse(tree)
+
+
+def compile_rules(spec, name="live"):
+    """Generate and compile the check/score functions for a rules spec."""
+    names = set()
+    checks = []
+    for rule in spec.get("filters", []):
+        checks.append((rule["name"], parse_expression(rule["expr"], names)))
+
+    # Constant fold normalize(value, max) * weight; zero weighted or unbounded terms are dropped.
+    max_values = spec.get("max_values", {})
+    terms = []
+    for field, weight in spec.get("weights", {}).items():
+        if field not in FIELDS:
+            raise RuleError(f"unknown weight field {field!r}")
+        max_value = max_values.get(field, 0)
+        if not weight or not max_value:
+            continue
+        names.add(field)
+        terms.append(f"min({field} / {float(max_value)!r}, 1) * {100 * float(weight)!r}")
+
+    for bonus in spec.get("bonuses", []):
+        terms.append(f"({float(bonus['points'])!r} if {parse_expression(bonus['expr'], names)} else 0)")
+
+    prologue = [f"    {field} = {FIELDS[field]}" for field in sorted(names)]
+    lines = ["def check(token_data):", *prologue]
+    for rule_name, expr in checks:
+        lines.append(f"    if not ({expr}):")
+        lines.append(f"        return {rule_name!r}")
+    lines.append("    return None")
+    lines += ["", "def score(token_data):", *prologue]
+    lines.append(f"    return round({' + '.join(terms) or '0'}, 2)")
+
+    namespace = {"__builtins__": {}, "_now": time.time, "len": len, "round": round, **FUNCTIONS}
+    exec(compile("\n".join(lines), f"<rules:{name}>", "exec"), namespace)
+    return namespace["check"], namespace["score"]
+
+
+class Ruleset:
+    def __init__(self, spec, name="live"):
+        spec = {**DEFAULT_RULES, **spec}
+        self.name = name
+        self.threshold_score = float(spec["threshold_score"])
+        self._check, self._score = compile_rules(spec, name)
+        self.evaluated = 0
+        self.passed = 0
+        self.alerted = 0
+
+    def check(self, token_data):
+        """Return the name of the first failing filter, or None if the token passes."""
+        try:
+            return self._check(token_data)
+        except Exception as e:
+            logging.error("Ruleset %s check error: %s", self.name, e)
+            return "error"
+
+    def score(self, token_data):
+        try:
+            return self._score(token_data)
+        except Exception as e:
+            logging.error("Ruleset %s score error: %s", self.name, e)
+            return 0.00
+
+    def evaluate(self, token_data):
+        """Return (rejection reason, potential score, alert) and update the alert rate counters."""
+        self.evaluated += 1
+        with stage("filter"):
+            reason = self.check(token_data)
+        if reason is not None:
+            return reason, 0.00, False
+
+        self.passed += 1
+        with stage("score"):
+            potential_score = self.score(token_data)
+        alert = potential_score >= self.threshold_score
+        if alert:
+            self.alerted += 1
+        return None, potential_score, alert
+
+    def stats(self):
+        return f"{self.name}: evaluated {self.evaluated}, passed {self.passed}, alerted {self.alerted}"
+
+
+def load_ruleset(path, name):
+    with open(path) as f:
+        return Ruleset(json.load(f), name)
+
+
+class RuleEngine:
+    """Live ruleset plus an optional shadow candidate, hot reloaded when their files change."""
+
+    def __init__(self, path=None, shadow_path=None):
+        self.path = path
+        self.shadow_path = shadow_path
+        self.live = Ruleset({}, "live")
+        self.shadow = None
+        self.disagreements = 0
+        self._versions = {}
+        self.reload_if_changed()
+
+    def _changed(self, attr, path):
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            # Logged once when the file goes missing, the current ruleset stays in place meanwhile
+            if self._versions.get(attr) is not MISSING:
+                self._versions[attr] = MISSING
+                logging.error("Rules file %s unavailable: %s", path, e)
+            return False
+
+        version = (stat.st_mtime_ns, stat.st_size)
+        if self._versions.get(attr) == version:
+            return False
+        self._versions[attr] = version
+        return True
+
+    def reload_if_changed(self):
+        """Recompile changed rule files; a file that fails to compile leaves the current ruleset in place."""
+        for attr, path in (("live", self.path), ("shadow", self.shadow_path)):
+            if not path or not self._changed(attr, path):
+                continue
+            try:
+                ruleset = load_ruleset(path, attr)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logging.error("Failed to load %s rules from %s: %s", attr, path, e)
+                continue
+
+            # Swapping the reference is atomic, callers holding the old ruleset finish with it
+            setattr(self, attr, ruleset)
+            logging.info("Loaded %s rules from %s", attr, path)
+
+    def evaluate(self, token_data):
+        live = self.live
+        result = live.evaluate(token_data)
+        shadow = self.shadow
+        if shadow is not None and shadow.evaluate(token_data)[2] != result[2]:
+            self.disagreements += 1
+        return result
+
+    def log_stats(self):
+        if self.shadow is None:
+            return
+        logging.info("Rules %s | %s | disagreements %d", self.live.stats(), self.shadow.stats(), self.disagreements)
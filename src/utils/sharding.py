@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import struct
+
+from utils.config import LOG_LEVEL, PROFILE_CYCLES, PROFILE_DIR, PROFILE_SLOWEST, PROFILE_SAMPLE_INTERVAL
+from utils.events import PurchaseEvent
+from utils.log_utils import setup_logging
+from utils.profiler import CycleProfiler
+from utils.task_manager import TaskManager
+
+# settings key holding the wallet list of each shardable monitor
+WALLET_SETTINGS = {"solana": "sol_wallets", "ethereum": "eth_wallets"}
+RESTART_DELAY = 5
+# Length prefix of every message on a shard channel
+FRAME_HEADER = struct.Struct("!I")
+
+
+def shard_for(wallet, shards):
+    """Rendezvous hashing, adding or removing a shard only moves the wallets that belong to it."""
+    def weight(shard):
+        return hashlib.blake2b(f"{shard}:{wallet}".encode(), digest_size=8).digest()
+
+    return max(range(shards), key=weight)
+
+
+def assign_shards(wallets, shards):
+    assignment = [[] for _ in range(shards)]
+    for wallet in wallets:
+        assignment[shard_for(wallet, shards)].append(wallet)
+    return assignment
+
+
+async def open_channel(conn):
+    """Turn one end of a multiprocessing Pipe into asyncio streams, so neither side ever blocks its loop."""
+    sock = socket.socket(fileno=os.dup(conn.fileno()))
+    conn.close()
+    return await asyncio.open_connection(sock=sock)
+
+
+def write_frame(writer, payload):
+    writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+async def read_frame(reader):
+    size, = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    return await reader.readexactly(size)
+
+
+def run_shard(name, wallets, settings, conn):
+    """Worker process entry point, runs one monitor over its share of wallets on its own loop."""
+    setup_logging(LOG_LEVEL, f"%(asctime)s - [{name} {os.getpid()}] %(message)s")
+    asyncio.run(_run_shard(name, wallets, settings, conn))
+
+
+async def _run_shard(name, wallets, settings, conn):
+    from monitors.registry import MONITOR_FACTORIES
+
+    reader, writer = await open_channel(conn)
+
+    async def publish(event):
+        write_frame(writer, event.encode())
+        # Waits while the aggregator is not reading, without blocking wallet updates
+        await writer.drain()
+
+    monitor = MONITOR_FACTORIES[name]({**settings, WALLET_SETTINGS[name]: wallets}, publish)
+
+    async def receive_wallets():
+        try:
+            while True:
+                monitor.set_wallets(json.loads(await read_frame(reader)))
+                logging.info(f"Rebalanced to {len(monitor.wallets)} wallets")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # The aggregator is gone, nothing left to report to
+            os._exit(0)
+
+    # Each worker profiles its own cycles, send SIGUSR1 to the worker pid to toggle it
+    task_manager = TaskManager(CycleProfiler(PROFILE_CYCLES, PROFILE_DIR, PROFILE_SLOWEST, PROFILE_SAMPLE_INTERVAL))
+    task_manager.add_task(receive_wallets())
+    task_manager.add_cycle(f"{name}-{os.getpid()}", monitor.run_cycle, monitor.interval)
+    await task_manager.run_all()
+
+
+class Shard:
+    def __init__(self, name, index, wallets):
+        self.name = name
+        self.index = index
+        self.wallets = wallets
+        self.process = None
+        # Stream writer of the channel to the worker, None until it is open
+        self.writer = None
+
+
+class ShardManager:
+    """Runs wallet monitors as hash sharded worker processes and feeds their events to `publish`.
+
+    Workers send length prefixed PurchaseEvent records over a pipe, wallet changes are sent back as JSON.
+    Events are read one at a time and only after the previous one was published, so a full bus backs up
+    into the worker, whose publish then waits in drain().
+    """
+
+    def __init__(self, names, settings, shards, publish, wallets_file=None):
+        self.names = names
+        self.settings = settings
+        self.shards_per_monitor = shards
+        self.publish = publish
+        self.wallets_file = wallets_file
+        self.wallets_version = None
+        self.shards = {}
+        # spawn keeps the parent's event loop and RPC connections out of the workers
+        self.context = multiprocessing.get_context("spawn")
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        for name in self.names:
+            assignment = assign_shards(self.settings[WALLET_SETTINGS[name]], self.shards_per_monitor)
+            self.shards[name] = [Shard(name, index, wallets) for index, wallets in enumerate(assignment)]
+            for shard in self.shards[name]:
+                self._spawn(loop, shard)
+
+    def _spawn(self, loop, shard):
+        parent_conn, child_conn = self.context.Pipe()
+        shard.writer = None
+        shard.process = self.context.Process(
+            target=run_shard,
+            args=(shard.name, shard.wallets, self.settings, child_conn),
+            name=f"{shard.name}-shard-{shard.index}",
+            daemon=True
+        )
+        shard.process.start()
+        child_conn.close()
+        loop.create_task(self._read_events(loop, shard, parent_conn, shard.wallets))
+        logging.info(f"Started {shard.process.name} with {len(shard.wallets)} wallets")
+
+    async def _read_events(self, loop, shard, conn, spawned_wallets):
+        reader, writer = await open_channel(conn)
+        shard.writer = writer
+        if shard.wallets != spawned_wallets:
+            # Rebalanced while the channel was opening
+            write_frame(writer, json.dumps(shard.wallets).encode())
+
+        try:
+            while True:
+                await self.publish(PurchaseEvent.decode(await read_frame(reader)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+        shard.writer = None
+        writer.close()
+        shard.process.join(0)
+        logging.error(f"{shard.process.name} exited with {shard.process.exitcode}, restarting")
+        loop.call_later(RESTART_DELAY, self._spawn, loop, shard)
+
+    def set_wallets(self, name, wallets):
+        """Reassign wallets to shards, only workers whose share changed are notified."""
+        self.settings = {**self.settings, WALLET_SETTINGS[name]: wallets}
+        if name not in self.shards:
+            return
+
+        for shard, shard_wallets in zip(self.shards[name], assign_shards(wallets, self.shards_per_monitor)):
+            if shard_wallets == shard.wallets:
+                continue
+            shard.wallets = shard_wallets
+            if shard.writer is None or shard.writer.is_closing():
+                # A worker being (re)started picks up shard.wallets once its channel is open
+                continue
+            # Buffered by the transport, never blocks the loop even while the worker is not reading
+            write_frame(shard.writer, json.dumps(shard_wallets).encode())
+
+    def reload_wallets(self):
+        try:
+            stat = os.stat(self.wallets_file)
+            version = (stat.st_mtime_ns, stat.st_size)
+            if version == self.wallets_version:
+                return
+            with open(self.wallets_file) as f:
+                wallets = json.load(f)
+            self.wallets_version = version
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to load wallets from {self.wallets_file}: {e}")
+            return
+
+        for name in self.names:
+            if name in wallets:
+                self.set_wallets(name, wallets[name])
+
+    async def run(self, reload_interval=30):
+        if self.wallets_file:
+            self.reload_wallets()
+        self.start()
+        while True:
+            await asyncio.sleep(reload_interval)
+            if self.wallets_file:
+                self.reload_wallets()
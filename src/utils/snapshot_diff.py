@@ -0,0 +1,30 @@
+from collections import OrderedDict
+
+
+def token_key(token):
+    return token.get("chainId"), token.get("tokenAddress")
+
+
+class SnapshotDiff:
+    """Yields the entries of a newest-first list that were not present in earlier snapshots."""
+
+    def __init__(self, key=token_key, max_seen=5000):
+        self.key = key
+        self.max_seen = max_seen
+        self.seen = OrderedDict()
+
+    def diff(self, snapshot):
+        new_entries = []
+        for entry in snapshot:
+            key = self.key(entry)
+            # The list is ordered newest first, everything after a known entry was seen before
+            if key in self.seen:
+                break
+            new_entries.append(entry)
+
+        for entry in reversed(new_entries):
+            self.seen[self.key(entry)] = None
+        while len(self.seen) > self.max_seen:
+            self.seen.popitem(last=False)
+
+        return new_entries
@@ -0,0 +1,114 @@
+import bisect
+import json
+import logging
+import os
+from typing import NamedTuple, FrozenSet
+
+
+class Subscription(NamedTuple):
+    chat_id: str
+    # Empty sets match everything
+    chains: FrozenSet[str] = frozenset()
+    tokens: FrozenSet[str] = frozenset()
+    wallets: FrozenSet[str] = frozenset()
+    # Applies to scored potential token alerts, wallet purchase alerts are matched by wallets instead
+    min_score: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            chat_id=str(data["chat_id"]),
+            chains=frozenset(data.get("chains", ())),
+            tokens=frozenset(data.get("tokens", ())),
+            wallets=frozenset(data.get("wallets", ())),
+            min_score=float(data.get("min_score", 0))
+        )
+
+    def to_dict(self):
+        return {
+            "chat_id": self.chat_id,
+            "chains": sorted(self.chains),
+            "tokens": sorted(self.tokens),
+            "wallets": sorted(self.wallets),
+            "min_score": self.min_score
+        }
+
+
+class SubscriptionIndex:
+    """Resolves the chats an alert goes to without scanning every subscription.
+
+    Chats are indexed by chain, token and wallet, with a separate set for each "match all" case,
+    and min scores are kept sorted so the chats accepting a score are a prefix found by bisect.
+    """
+
+    def __init__(self, subscriptions=(), path=None):
+        self.path = path
+        self.subscriptions = {}
+        for subscription in subscriptions:
+            self.subscriptions[subscription.chat_id] = subscription
+        self._rebuild()
+
+    @classmethod
+    def load(cls, path, default_chat_id=None):
+        """Read subscriptions from a JSON list, falling back to one chat receiving every alert."""
+        if path and os.path.exists(path):
+            with open(path) as f:
+                return cls([Subscription.from_dict(data) for data in json.load(f)], path)
+
+        subscriptions = [Subscription(str(default_chat_id))] if default_chat_id else []
+        return cls(subscriptions, path)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump([subscription.to_dict() for subscription in self.subscriptions.values()], f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def subscribe(self, subscription):
+        self.subscriptions[subscription.chat_id] = subscription
+        self._rebuild()
+        self.save()
+
+    def unsubscribe(self, chat_id):
+        if self.subscriptions.pop(str(chat_id), None) is not None:
+            self._rebuild()
+            self.save()
+
+    def _rebuild(self):
+        self.by_chain, self.all_chains = self._invert("chains")
+        self.by_token, self.all_tokens = self._invert("tokens")
+        self.by_wallet, self.all_wallets = self._invert("wallets")
+        ordered = sorted(self.subscriptions.values(), key=lambda subscription: subscription.min_score)
+        self.min_scores = [subscription.min_score for subscription in ordered]
+        self.score_chats = [subscription.chat_id for subscription in ordered]
+        logging.info("Indexed %d subscriptions", len(self.subscriptions))
+
+    def _invert(self, field):
+        index = {}
+        match_all = set()
+        for subscription in self.subscriptions.values():
+            values = getattr(subscription, field)
+            if not values:
+                match_all.add(subscription.chat_id)
+            for value in values:
+                index.setdefault(value, set()).add(subscription.chat_id)
+        return index, match_all
+
+    def match(self, event):
+        candidates = self.by_chain.get(event.chain, set()) | self.all_chains
+        candidates &= self.by_token.get(event.token_address, set()) | self.all_tokens
+        if not candidates:
+            return set()
+
+        if event.wallets:
+            wallet_chats = set(self.all_wallets)
+            for wallet in event.wallets:
+                wallet_chats |= self.by_wallet.get(wallet, set())
+            return candidates & wallet_chats
+
+        accepted = bisect.bisect_right(self.min_scores, event.score)
+        if accepted < len(candidates):
+            return candidates.intersection(self.score_chats[:accepted])
+        return {chat_id for chat_id in candidates if self.subscriptions[chat_id].min_score <= event.score}
@@ -1,12 +1,32 @@
 import asyncio
+import logging
 
 
 class TaskManager:
-    def __init__(self):
+    def __init__(self, profiler=None):
         self.tasks = []
+        self.profiler = profiler
 
     def add_task(self, task):
         self.tasks.append(task)
 
+    def add_cycle(self, name, cycle, interval):
+        """Run `cycle` every `interval` seconds, profiled when the profiler is enabled."""
+        self.add_task(self._run_cycles(name, cycle, interval))
+
+    async def _run_cycles(self, name, cycle, interval):
+        while True:
+            try:
+                if self.profiler is not None:
+                    await self.profiler.run_cycle(name, cycle, interval)
+                else:
+                    await cycle()
+            except Exception as e:
+                logging.error(f"{name} cycle error: {e}")
+
+            await asyncio.sleep(interval)
+
     async def run_all(self):
+        if self.profiler is not None:
+            self.profiler.install_signal_handler()
         await asyncio.gather(*self.tasks)
@@ -0,0 +1,26 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        return value
+
+    def set(self, key, value):
+        self.entries.pop(key, None)
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        # Entries share one ttl, so the oldest insert is also the first to expire
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)